@@ -1,4 +1,5 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import openai
 import openrouter
 from PIL import Image
@@ -10,6 +11,8 @@ import os
 import json
 import tempfile
 from tts_utils import TTSEngine  # Import the TTSEngine
+from search_index import SearchIndex
+from config import SEGMENT_INDEX_FILE
 import google.generativeai as genai
 
 # Configure page settings
@@ -36,6 +39,8 @@ if 'generated_audio_path' not in st.session_state:
     st.session_state.generated_audio_path = None
 if 'current_script' not in st.session_state:
     st.session_state.current_script = ""  # Add session state for the script
+if 'current_document_id' not in st.session_state:
+    st.session_state.current_document_id = None
 
 def extract_text_from_pdf(pdf_file):
     pdf_reader = PyPDF2.PdfReader(pdf_file)
@@ -108,7 +113,123 @@ def synthesize_speech(text, voice_name):
         st.error(f"Error synthesizing speech: {str(e)}")
         return None
 
+# Player for segmented podcasts that requests one segment at a time
+segment_player = components.declare_component(
+    "segment_player",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "segment_player")
+)
+
+def render_segment_stream(tts_engine, index, position, key):
+    """
+    Stream a segmented podcast from a position, one segment per rerun.
+
+    The player reports the segment it needs next as its value, so each rerun
+    reads only that segment from disk and sends it to the browser.
+
+    Args:
+        tts_engine (TTSEngine): Engine used to read the segment index.
+        index (dict): Loaded segment index.
+        position (float): Position in seconds to start playback from.
+        key (str): Widget key, unique per player on the page.
+    """
+    segment_path, offset = tts_engine.locate_offset(index, position)
+    segment_paths = tts_engine.get_segment_paths(index)
+    seek_number = segment_paths.index(segment_path)
+    seek = f"{index['directory']}:{position}"
+
+    # Continue from the segment the player asked for, unless the user has seeked since
+    number = seek_number
+    requested = st.session_state.get(key)
+    if requested and requested.get('seek') == seek and requested['segment'] < len(segment_paths):
+        number = requested['segment']
+        offset = 0.0
+
+    with open(segment_paths[number], 'rb') as f:
+        audio = f.read()
+
+    segment_player(
+        seek=seek,
+        segment=number,
+        offset=offset,
+        count=len(segment_paths),
+        audio=audio,
+        key=key,
+        default=None
+    )
+
+def render_segmented_player(tts_engine, index_path, key="episode_player"):
+    """
+    Play a segmented podcast from the chosen chapter or position.
+
+    Args:
+        tts_engine (TTSEngine): Engine used to read the segment index.
+        index_path (str): Path to the index written alongside the segments.
+        key (str, optional): Widget key for the player. Defaults to "episode_player".
+    """
+    index = tts_engine.load_segment_index(index_path)
+    if not index['segments']:
+        st.warning("⚠️ This podcast has no audio segments.")
+        return
+    chapters = index['chapters']
+
+    if chapters:
+        chapter_number = st.selectbox(
+            "Chapter",
+            range(len(chapters)),
+            format_func=lambda i: f"{int(chapters[i]['start'] // 60)}:{int(chapters[i]['start'] % 60):02d} - {chapters[i]['title']}",
+            help="Jump to a speaker turn in the podcast"
+        )
+        default_position = int(chapters[chapter_number]['start'])
+    else:
+        default_position = 0
+
+    position = st.slider(
+        "Position (seconds)",
+        min_value=0,
+        max_value=max(int(index['duration']), 1),
+        value=default_position,
+        help="Seek within the podcast; playback starts from the matching segment"
+    )
+    render_segment_stream(tts_engine, index, position, key)
+
+def play_from_offset(tts_engine, audio_path, offset):
+    """
+    Play a generated podcast starting at the given timeline offset.
+
+    Args:
+        tts_engine (TTSEngine): Engine used to read segment indexes.
+        audio_path (str): Combined audio file or segment index of the podcast.
+        offset (float): Position in seconds to start playback from.
+    """
+    if audio_path.endswith(SEGMENT_INDEX_FILE):
+        render_segment_stream(tts_engine, tts_engine.load_segment_index(audio_path), offset, "search_player")
+    else:
+        st.audio(audio_path, start_time=int(offset))
+
+def index_podcast(search_index, tts_engine, document_id, script, audio_path):
+    """
+    Add a generated podcast's speaker turns to the search index.
+
+    Turn offsets come from the podcast's chapters, which are written for both
+    segmented and combined output.
+    """
+    try:
+        turns = tts_engine._split_script_by_speakers(script)
+        starts = [chapter['start'] for chapter in tts_engine.load_chapters(audio_path)]
+        search_index.add_podcast(
+            document_id,
+            audio_path,
+            [{'text': turn['text'], 'start': start} for turn, start in zip(turns, starts)]
+        )
+    except Exception as e:
+        print(f"Error indexing podcast: {str(e)}")
+
 def main():
+    # Open the search index for this run and close it when the run ends
+    with SearchIndex() as search_index:
+        render_app(search_index)
+
+def render_app(search_index):
     # Initialize TTS Engine
     tts_engine = TTSEngine()
     
@@ -143,6 +264,14 @@ def main():
                 help="Voice for the expert guest"
             )
 
+        # Audio Output Configuration
+        with st.expander("Audio Settings", expanded=False):
+            segmented_output = st.checkbox(
+                "Segmented output",
+                value=False,
+                help="Write the podcast as short segments with chapters for faster playback and seeking"
+            )
+
     # Check for missing voice models
     missing_models = tts_engine.check_voice_models()
     if missing_models:
@@ -150,6 +279,36 @@ def main():
         with st.expander("Missing Models Details"):
             st.write(", ".join(missing_models))
 
+    # Search across previously processed notes and podcasts
+    st.markdown("### 🔎 Search Your Podcasts")
+    query = st.text_input(
+        "Search",
+        help="Find which of your notes and podcasts covered a topic"
+    )
+    if query:
+        try:
+            results = search_index.search(query)
+        except Exception as e:
+            print(f"Error searching index: {str(e)}")
+            st.error("❌ Search is unavailable right now.")
+            results = []
+        else:
+            if not results:
+                st.info("No matches found.")
+        if results:
+            # Only the selected result gets a player, so a long result list stays light
+            choice = st.radio(
+                "Results",
+                range(len(results)),
+                format_func=lambda i: f"{results[i]['document']} ({results[i]['kind']}): {results[i]['snippet']}",
+                help="Pick a result to play the matching point of its podcast"
+            )
+            result = results[choice]
+            if result['audio_path'] and os.path.exists(result['audio_path']):
+                play_from_offset(tts_engine, result['audio_path'], result['offset'])
+            else:
+                st.caption("No podcast has been generated for this document yet.")
+
     # Main content area
     st.markdown("### 📝 Step 1: Upload Your PDF")
     uploaded_file = st.file_uploader(
@@ -163,14 +322,26 @@ def main():
         with st.spinner("Extracting text from your PDF..."):
             text = extract_text_from_pdf(uploaded_file)
         
-        # Automatically generate point-form summary
-        if gemini_api_key:
+        # Automatically generate point-form summary once per uploaded file; the
+        # segmented player reruns the page as it streams
+        upload_id = (uploaded_file.name, uploaded_file.size)
+        already_summarized = st.session_state.get('summary_source') == upload_id
+        if gemini_api_key and not already_summarized:
             with st.spinner("🤖 AI is summarizing your content..."):
                 summary = generate_point_form_summary(text, gemini_api_key)
                 if summary:
                     st.session_state.current_summary = summary
+                    st.session_state.summary_source = upload_id
+                    try:
+                        st.session_state.current_document_id = search_index.add_document(
+                            uploaded_file.name,
+                            text,
+                            summary
+                        )
+                    except Exception as e:
+                        print(f"Error indexing document: {str(e)}")
                     st.success("✅ Point-form summary generated successfully!")
-        else:
+        elif not gemini_api_key:
             st.error("🔑 Please enter your Gemini API key in the sidebar first.")
         
         # Display the point-form summary
@@ -197,9 +368,12 @@ def main():
                                     audio_path = tts_engine.generate_podcast_audio(
                                         script,
                                         speaker1_voice,
-                                        speaker2_voice
+                                        speaker2_voice,
+                                        segmented=segmented_output
                                     )
                                     st.session_state.generated_audio_path = audio_path
+                                    if st.session_state.current_document_id is not None:
+                                        index_podcast(search_index, tts_engine, st.session_state.current_document_id, script, audio_path)
                                     st.success("✅ Podcast generated successfully!")
                                 except Exception as e:
                                     st.error(f"❌ Error generating audio: {str(e)}")
@@ -207,7 +381,10 @@ def main():
         # Play and download the generated podcast
         if st.session_state.generated_audio_path:
             st.markdown("### 🎧 Step 2: Listen to Your Podcast")
-            st.audio(st.session_state.generated_audio_path)
+            if st.session_state.generated_audio_path.endswith(SEGMENT_INDEX_FILE):
+                render_segmented_player(tts_engine, st.session_state.generated_audio_path)
+            else:
+                st.audio(st.session_state.generated_audio_path)
 
             # Add a dropdown to view the podcast script (above the download button)
             with st.expander("📜 View Podcast Script"):
@@ -226,9 +403,12 @@ def main():
                                 audio_path = tts_engine.generate_podcast_audio(
                                     st.session_state.current_script,
                                     speaker1_voice, #Host
-                                    speaker2_voice #Expert
+                                    speaker2_voice, #Expert
+                                    segmented=segmented_output
                                 )
                                 st.session_state.generated_audio_path = audio_path
+                                if st.session_state.current_document_id is not None:
+                                    index_podcast(search_index, tts_engine, st.session_state.current_document_id, st.session_state.current_script, audio_path)
                                 st.success("✅ Audio generated! Switch to the Audio tab.")
                             except Exception as e:
                                 st.error(f"❌ Error generating audio: {str(e)}")
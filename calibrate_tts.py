@@ -0,0 +1,177 @@
+import argparse
+import os
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from tts_utils import TTSEngine
+
+# Reference script used for every calibration run
+REFERENCE_SCRIPT = """
+**Host:** Welcome back to NoteCast. Today we are looking at how memory works when you study.
+**Expert:** Thanks for having me. The short version is that spacing out your reviews beats cramming almost every time.
+**Host:** So reading my notes five times the night before an exam is not the best plan?
+**Expert:** It feels productive, but most of that information fades within a few days. Short reviews spread over a week stick much better.
+**Host:** What about testing yourself instead of rereading?
+**Expert:** Retrieval practice is one of the strongest techniques we know of. Every time you pull an idea out of memory, you make it easier to find next time.
+"""
+
+# Configurations within this fraction of the best throughput count as a tie
+THROUGHPUT_TOLERANCE = 0.05
+
+
+def _default_grid(cpu_count):
+    """Build worker and thread candidates up to the number of available cores."""
+    candidates = []
+    value = 1
+    while value < cpu_count:
+        candidates.append(value)
+        value *= 2
+    candidates.append(cpu_count)
+    return candidates
+
+
+def _audio_duration(audio_path):
+    """Return the duration of a WAV file in seconds."""
+    with wave.open(audio_path, 'rb') as wf:
+        return wf.getnframes() / wf.getframerate()
+
+
+def measure(tts_engine, voice_name, texts, workers, threads):
+    """
+    Synthesize the reference texts with the given settings and time the run.
+
+    Args:
+        tts_engine (TTSEngine): Engine used for synthesis.
+        voice_name (str): Voice to calibrate.
+        texts (list): Reference texts, synthesized in parallel.
+        workers (int): Number of parallel synthesis workers.
+        threads (int): ONNX Runtime intra-op threads per worker.
+
+    Returns:
+        dict: Real-time factor and throughput for the run.
+    """
+    def synthesize(text):
+        start = time.perf_counter()
+        audio_path = tts_engine._synthesize_segment(text, voice_name, threads)
+        elapsed = time.perf_counter() - start
+        try:
+            return elapsed, _audio_duration(audio_path)
+        finally:
+            os.unlink(audio_path)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(synthesize, texts))
+    wall_time = time.perf_counter() - start
+
+    synthesis_time = sum(elapsed for elapsed, _ in results)
+    audio_time = sum(duration for _, duration in results)
+    return {
+        # Seconds spent synthesizing per second of audio, for a single segment
+        'real_time_factor': synthesis_time / audio_time,
+        # Seconds of audio produced per wall-clock second across all workers
+        'throughput': audio_time / wall_time
+    }
+
+
+def calibrate_voice(tts_engine, voice_name, worker_counts, thread_counts, repeats=1):
+    """
+    Run the calibration grid for a voice and return the best settings.
+
+    A podcast is synthesized as one batch and the user waits for the whole
+    episode, so the winner is the configuration with the highest throughput.
+    Among configurations within THROUGHPUT_TOLERANCE of that, the lowest
+    real-time factor wins, because it finishes each segment soonest and
+    leaves more headroom when other work shares the CPU.
+    """
+    cpu_count = os.cpu_count() or 1
+    segments = tts_engine._split_script_by_speakers(REFERENCE_SCRIPT)
+    texts = [segment['text'] for segment in segments]
+    # Give every worker something to do so the grid compares like with like
+    while len(texts) < max(worker_counts):
+        texts = texts + texts
+
+    results = []
+    for workers in worker_counts:
+        for threads in thread_counts:
+            if workers * threads > cpu_count:
+                continue
+
+            # Warm-up run loads a session per worker so model loading is not timed
+            measure(tts_engine, voice_name, texts, workers, threads)
+            runs = [measure(tts_engine, voice_name, texts, workers, threads) for _ in range(repeats)]
+            result = {
+                'workers': workers,
+                'threads': threads,
+                'real_time_factor': min(run['real_time_factor'] for run in runs),
+                'throughput': max(run['throughput'] for run in runs)
+            }
+            print(
+                f"{voice_name}: workers={workers} threads={threads} "
+                f"rtf={result['real_time_factor']:.3f} throughput={result['throughput']:.2f}x"
+            )
+            results.append(result)
+
+    if not results:
+        raise ValueError("No worker/thread combination fits the available CPU cores")
+
+    best_throughput = max(result['throughput'] for result in results)
+    best = min(
+        (result for result in results if result['throughput'] >= best_throughput * (1 - THROUGHPUT_TOLERANCE)),
+        key=lambda result: result['real_time_factor']
+    )
+
+    best['calibrated_at'] = datetime.now().isoformat(timespec='seconds')
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Calibrate Piper worker and ONNX thread counts for this host."
+    )
+    parser.add_argument(
+        '--voices',
+        nargs='+',
+        help="Voice IDs to calibrate (defaults to every installed voice)"
+    )
+    parser.add_argument(
+        '--workers',
+        nargs='+',
+        type=int,
+        help="Worker counts to try (defaults to powers of two up to the core count)"
+    )
+    parser.add_argument(
+        '--threads',
+        nargs='+',
+        type=int,
+        help="ONNX thread counts to try (defaults to powers of two up to the core count)"
+    )
+    parser.add_argument(
+        '--repeats',
+        type=int,
+        default=1,
+        help="Runs per combination; the best run is kept"
+    )
+    args = parser.parse_args()
+
+    tts_engine = TTSEngine()
+    missing_models = tts_engine.check_voice_models()
+    voices = args.voices or [voice for voice in tts_engine.voices if voice not in missing_models]
+    if not voices:
+        parser.error("No installed voice models to calibrate")
+
+    cpu_count = os.cpu_count() or 1
+    worker_counts = args.workers or _default_grid(cpu_count)
+    thread_counts = args.threads or _default_grid(cpu_count)
+
+    for voice_name in voices:
+        if voice_name not in tts_engine.voices:
+            parser.error(f"Unknown voice: {voice_name}")
+        best = calibrate_voice(tts_engine, voice_name, worker_counts, thread_counts, args.repeats)
+        tts_engine.save_tuning(voice_name, best)
+        print(f"Saved {voice_name}: workers={best['workers']} threads={best['threads']}")
+
+
+if __name__ == "__main__":
+    main()
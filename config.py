@@ -33,11 +33,22 @@ PIPER_VOICES = {
     }
 }
 
+# Synthesis Tuning Configuration
+TTS_TUNING_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_tuning.json")
+DEFAULT_SYNTHESIS_WORKERS = 1  # Parallel Piper processes when no calibration exists
+DEFAULT_ONNX_THREADS = None  # None runs the piper CLI and lets ONNX Runtime pick its thread count
+
 # Audio Configuration
 AUDIO_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output")
 SAMPLE_RATE = 22050
 AUDIO_FORMAT = "wav"
 
+# Segmented Output Configuration
+SEGMENT_DURATION = 30  # Length of each media segment in seconds
+SEGMENT_INDEX_FILE = "index.json"  # Chapter/segment index written next to the segments
+SEGMENT_PLAYLIST_FILE = "playlist.m3u"  # Playlist listing the segments in order
+CHAPTERS_FILE_SUFFIX = ".chapters.json"  # Chapter offsets written next to a combined audio file
+
 # Ensure required directories exist
 os.makedirs(PIPER_MODELS_DIR, exist_ok=True)
 os.makedirs(AUDIO_OUTPUT_DIR, exist_ok=True)
@@ -54,6 +65,11 @@ SUMMARY_TEMPERATURE = 0.7
 SCRIPT_MAX_TOKENS = 2000
 SCRIPT_TEMPERATURE = 0.8
 
+# Search Index Configuration
+SEARCH_INDEX_PATH = os.path.join(AUDIO_OUTPUT_DIR, "notecast_index.db")
+SEARCH_MAX_RESULTS = 10
+SEARCH_SNIPPET_LENGTH = 200  # Characters of matching text shown per result
+
 # UI Configuration
 SUPPORTED_FILE_TYPES = ['pdf', 'docx', 'png', 'jpg', 'jpeg']
 SUPPORTED_LANGUAGES = ['en-US', 'en-GB']
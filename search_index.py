@@ -0,0 +1,285 @@
+import hashlib
+import math
+import sqlite3
+from collections import Counter
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from text_utils import TextProcessor
+from config import SEARCH_INDEX_PATH, SEARCH_MAX_RESULTS, SEARCH_SNIPPET_LENGTH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    content_hash TEXT NOT NULL UNIQUE,
+    language TEXT,
+    keywords TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS podcasts (
+    id INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents(id),
+    audio_path TEXT NOT NULL UNIQUE,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents(id),
+    podcast_id INTEGER REFERENCES podcasts(id),
+    kind TEXT NOT NULL,
+    text TEXT NOT NULL,
+    start_time REAL,
+    length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    entry_id INTEGER NOT NULL REFERENCES entries(id),
+    tf INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats (name, value) VALUES ('entries', 0);
+CREATE INDEX IF NOT EXISTS idx_postings_term_entry ON postings(term, entry_id, tf);
+CREATE INDEX IF NOT EXISTS idx_postings_entry ON postings(entry_id);
+CREATE INDEX IF NOT EXISTS idx_entries_document ON entries(document_id, kind);
+CREATE INDEX IF NOT EXISTS idx_podcasts_document ON podcasts(document_id);
+"""
+
+
+class SearchIndex:
+    """
+    On-disk inverted index over uploaded notes, their summaries and podcasts.
+
+    Every indexed passage (a document chunk, a summary point or a podcast
+    speaker turn) is stored as an entry, and each term links to the entries
+    it appears in. Queries are ranked with TF-IDF over those entries, using
+    document frequencies kept up to date as entries are added and removed.
+    """
+
+    def __init__(self, index_path: str = SEARCH_INDEX_PATH):
+        self.conn = sqlite3.connect(index_path)
+        # Cheap with IF NOT EXISTS, and recreates the tables if the file was removed
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self) -> 'SearchIndex':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _add_entry(self, document_id: int, kind: str, text: str,
+                   podcast_id: Optional[int] = None, offset: Optional[float] = None) -> None:
+        """Store a passage and its term postings."""
+        terms = TextProcessor.tokenize(text)
+        if not terms:
+            return
+
+        cursor = self.conn.execute(
+            "INSERT INTO entries (document_id, podcast_id, kind, text, start_time, length) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (document_id, podcast_id, kind, text, offset, len(terms))
+        )
+        term_counts = Counter(terms)
+        self.conn.executemany(
+            "INSERT INTO postings (term, entry_id, tf) VALUES (?, ?, ?)",
+            [(term, cursor.lastrowid, tf) for term, tf in term_counts.items()]
+        )
+        self.conn.executemany(
+            "INSERT INTO terms (term, df) VALUES (?, 1) "
+            "ON CONFLICT(term) DO UPDATE SET df = df + 1",
+            [(term,) for term in term_counts]
+        )
+        self.conn.execute("UPDATE stats SET value = value + 1 WHERE name = 'entries'")
+
+    def _delete_entries(self, where: str, params: tuple) -> None:
+        """Remove entries matching a condition along with their postings."""
+        removed_terms = self.conn.execute(
+            f"SELECT term, COUNT(*) FROM postings "
+            f"WHERE entry_id IN (SELECT id FROM entries WHERE {where}) GROUP BY term",
+            params
+        ).fetchall()
+        self.conn.executemany(
+            "UPDATE terms SET df = df - ? WHERE term = ?",
+            [(count, term) for term, count in removed_terms]
+        )
+        self.conn.execute("DELETE FROM terms WHERE df <= 0")
+
+        self.conn.execute(
+            f"DELETE FROM postings WHERE entry_id IN (SELECT id FROM entries WHERE {where})",
+            params
+        )
+        cursor = self.conn.execute(f"DELETE FROM entries WHERE {where}", params)
+        self.conn.execute(
+            "UPDATE stats SET value = value - ? WHERE name = 'entries'",
+            (cursor.rowcount,)
+        )
+
+    def add_document(self, name: str, text: str, summary: Optional[str] = None) -> int:
+        """
+        Index an uploaded document and, optionally, its point-form summary.
+
+        Re-adding the same text reuses the existing document and only
+        replaces its summary points, so the index grows incrementally.
+
+        Args:
+            name (str): Display name of the document (e.g. the uploaded filename)
+            text (str): Extracted document text
+            summary (str, optional): Generated summary to index point by point
+
+        Returns:
+            int: ID of the indexed document
+        """
+        content_hash = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        row = self.conn.execute(
+            "SELECT id FROM documents WHERE content_hash = ?", (content_hash,)
+        ).fetchone()
+
+        with self.conn:
+            if row:
+                document_id = row[0]
+            else:
+                cursor = self.conn.execute(
+                    "INSERT INTO documents (name, content_hash, language, keywords, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        name,
+                        content_hash,
+                        TextProcessor.detect_language(text),
+                        ', '.join(TextProcessor.extract_keywords(text)),
+                        datetime.now().isoformat(timespec='seconds')
+                    )
+                )
+                document_id = cursor.lastrowid
+                for chunk in TextProcessor.chunk_text(TextProcessor.clean_text(text)):
+                    self._add_entry(document_id, 'document', chunk)
+
+            if summary:
+                self._delete_entries("document_id = ? AND kind = 'summary'", (document_id,))
+                points = TextProcessor.extract_structure(summary)['bullet_points']
+                if not points:
+                    points = [line.strip() for line in summary.split('\n') if line.strip()]
+                for point in points:
+                    self._add_entry(document_id, 'summary', point.strip())
+
+        return document_id
+
+    def add_podcast(self, document_id: int, audio_path: str, turns: List[Dict[str, Any]]) -> None:
+        """
+        Index a generated podcast so its speaker turns can be searched.
+
+        Args:
+            document_id (int): Document the podcast was generated from
+            audio_path (str): Combined audio file or segment index of the podcast
+            turns (List[Dict[str, Any]]): Turns with 'text' and 'start' (seconds) keys
+        """
+        with self.conn:
+            row = self.conn.execute(
+                "SELECT id FROM podcasts WHERE audio_path = ?", (audio_path,)
+            ).fetchone()
+            if row:
+                return
+
+            cursor = self.conn.execute(
+                "INSERT INTO podcasts (document_id, audio_path, created_at) VALUES (?, ?, ?)",
+                (document_id, audio_path, datetime.now().isoformat(timespec='seconds'))
+            )
+            for turn in turns:
+                self._add_entry(document_id, 'podcast', turn['text'],
+                                podcast_id=cursor.lastrowid, offset=turn['start'])
+
+    def search(self, query: str, max_results: int = SEARCH_MAX_RESULTS) -> List[Dict[str, Any]]:
+        """
+        Find the passages that best match a query, ranked by TF-IDF.
+
+        Args:
+            query (str): Free-text query
+            max_results (int, optional): Maximum number of results. Defaults to SEARCH_MAX_RESULTS.
+
+        Returns:
+            List[Dict[str, Any]]: Matches with document, kind, snippet, score and,
+            for podcast turns, the audio path and timeline offset
+        """
+        terms = sorted(set(TextProcessor.tokenize(query)))
+        if not terms:
+            return []
+
+        placeholders = ', '.join('?' for _ in terms)
+        document_frequencies = self.conn.execute(
+            f"SELECT term, df FROM terms WHERE term IN ({placeholders})", terms
+        ).fetchall()
+        if not document_frequencies:
+            return []
+        total_entries = self.conn.execute(
+            "SELECT value FROM stats WHERE name = 'entries'"
+        ).fetchone()[0]
+
+        # Score every matching entry in one aggregate query, carrying each
+        # term's IDF in and fetching metadata for the top results only. Notes
+        # and summary hits borrow the best-scoring podcast turn of the same
+        # document, falling back to the start of its latest episode.
+        query_terms = ', '.join('(?, ?)' for _ in document_frequencies)
+        params = []
+        for term, df in document_frequencies:
+            params.extend((term, math.log(1 + total_entries / df)))
+        params.append(max_results)
+
+        rows = self.conn.execute(
+            f"WITH query_terms(term, idf) AS (VALUES {query_terms}), "
+            "scored AS ("
+            " SELECT entries.id AS entry_id, entries.document_id, entries.podcast_id, "
+            " entries.start_time, entries.kind, "
+            " SUM(postings.tf * query_terms.idf) / entries.length AS score "
+            " FROM query_terms "
+            " JOIN postings ON postings.term = query_terms.term "
+            " JOIN entries ON entries.id = postings.entry_id "
+            " GROUP BY entries.id), "
+            "ranked AS (SELECT * FROM scored ORDER BY score DESC LIMIT ?), "
+            # SQLite takes the bare columns from the row holding MAX(score)
+            "best_turns AS ("
+            " SELECT document_id, podcast_id, start_time, MAX(score) "
+            " FROM scored WHERE kind = 'podcast' GROUP BY document_id) "
+            "SELECT ranked.score, documents.name, documents.language, ranked.kind, "
+            "entries.text, ranked.start_time, podcasts.audio_path, "
+            "best_podcasts.audio_path, best_turns.start_time, "
+            "(SELECT latest.audio_path FROM podcasts AS latest "
+            " WHERE latest.document_id = ranked.document_id "
+            " ORDER BY latest.id DESC LIMIT 1) "
+            "FROM ranked "
+            "JOIN entries ON entries.id = ranked.entry_id "
+            "JOIN documents ON documents.id = ranked.document_id "
+            "LEFT JOIN podcasts ON podcasts.id = ranked.podcast_id "
+            "LEFT JOIN best_turns ON best_turns.document_id = ranked.document_id "
+            "LEFT JOIN podcasts AS best_podcasts ON best_podcasts.id = best_turns.podcast_id "
+            "ORDER BY ranked.score DESC",
+            params
+        ).fetchall()
+
+        results = []
+        for (score, name, language, kind, text, offset, audio_path,
+             turn_audio_path, turn_offset, latest_audio_path) in rows:
+            if audio_path is None and turn_audio_path is not None:
+                audio_path, offset = turn_audio_path, turn_offset
+            elif audio_path is None and latest_audio_path is not None:
+                audio_path, offset = latest_audio_path, 0.0
+
+            snippet = text if len(text) <= SEARCH_SNIPPET_LENGTH else text[:SEARCH_SNIPPET_LENGTH] + '...'
+            results.append({
+                'document': name,
+                'language': language,
+                'kind': kind,
+                'snippet': snippet,
+                'score': score,
+                'audio_path': audio_path,
+                'offset': offset
+            })
+
+        return results
@@ -7,6 +7,12 @@ import pytesseract
 import io
 from config import MAX_TEXT_LENGTH, CHUNK_SIZE
 
+# Common words ignored by keyword extraction and search indexing
+STOP_WORDS = {
+    'the', 'and', 'is', 'in', 'to', 'of', 'a', 'for', 'that', 'this', 
+    'an', 'be', 'have', 'it', 'on', 'at', 'are', 'was', 'were', 'will'
+}
+
 class TextProcessor:
     @staticmethod
     def clean_text(text: str) -> str:
@@ -202,6 +208,24 @@ class TextProcessor:
             print(f"Error detecting language: {e}")
             return 'unknown'
 
+    @staticmethod
+    def tokenize(text: str, min_length: int = 2) -> List[str]:
+        """
+        Split text into lowercase terms, dropping stop words and short tokens.
+        
+        Args:
+            text (str): Input text to tokenize
+            min_length (int, optional): Minimum term length to keep. Defaults to 2.
+        
+        Returns:
+            List[str]: Terms in the order they appear
+        """
+        if not text:
+            return []
+        
+        words = re.findall(r'\b\w+\b', text.lower())
+        return [word for word in words if word not in STOP_WORDS and len(word) >= min_length]
+
     @staticmethod
     def extract_keywords(text: str, max_keywords: int = 10) -> List[str]:
         """Extract key terms and phrases from the text with improved extraction."""
@@ -209,15 +233,8 @@ class TextProcessor:
             return []
         
         try:
-            # More comprehensive stop words list
-            common_words = {
-                'the', 'and', 'is', 'in', 'to', 'of', 'a', 'for', 'that', 'this', 
-                'an', 'be', 'have', 'it', 'on', 'at', 'are', 'was', 'were', 'will'
-            }
-            
             # Tokenize and clean words
-            words = re.findall(r'\b\w+\b', text.lower())
-            keywords = [word for word in words if word not in common_words and len(word) > 3]
+            keywords = TextProcessor.tokenize(text, min_length=4)
             
             # Count frequency with additional weight for unique words
             keyword_freq = {}
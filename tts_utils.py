@@ -1,6 +1,10 @@
 import os
 import json
+import platform
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_EXCEPTION, wait
+from contextlib import contextmanager, suppress
 from datetime import datetime
 import subprocess
 import wave
@@ -9,13 +13,73 @@ from config import (
     PIPER_VOICES,
     AUDIO_OUTPUT_DIR,
     SAMPLE_RATE,
-    AUDIO_FORMAT
+    AUDIO_FORMAT,
+    SEGMENT_DURATION,
+    SEGMENT_INDEX_FILE,
+    SEGMENT_PLAYLIST_FILE,
+    CHAPTERS_FILE_SUFFIX,
+    TTS_TUNING_FILE,
+    DEFAULT_SYNTHESIS_WORKERS,
+    DEFAULT_ONNX_THREADS
 )
 
 class TTSEngine:
     def __init__(self):
         self.voices = PIPER_VOICES
         self.output_dir = AUDIO_OUTPUT_DIR
+        self.tuning = self._load_tuning()
+        self._idle_voices = {}
+        self._voice_lock = threading.Lock()
+
+    @staticmethod
+    def _host_key():
+        """Identify the host hardware (CPU model and core count) for calibrated settings."""
+        cpu_model = platform.processor() or platform.machine()
+        try:
+            with open('/proc/cpuinfo', 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.startswith('model name'):
+                        cpu_model = line.split(':', 1)[1].strip()
+                        break
+        except OSError:
+            pass
+        return f"{cpu_model} x{os.cpu_count()}"
+
+    def _load_tuning(self):
+        """Load calibrated worker/thread settings for this host, keyed by voice."""
+        if not os.path.exists(TTS_TUNING_FILE):
+            return {}
+
+        try:
+            with open(TTS_TUNING_FILE, 'r', encoding='utf-8') as f:
+                tuning = json.load(f)
+            host = tuning.get('hosts', {}).get(self._host_key(), {})
+            return host.get('voices', {})
+        except (OSError, ValueError) as e:
+            print(f"Error loading TTS tuning: {str(e)}")
+            return {}
+
+    def save_tuning(self, voice_name, settings):
+        """Persist calibrated settings for a voice on this host."""
+        tuning = {'hosts': {}}
+        if os.path.exists(TTS_TUNING_FILE):
+            with open(TTS_TUNING_FILE, 'r', encoding='utf-8') as f:
+                tuning = json.load(f)
+
+        host = tuning.setdefault('hosts', {}).setdefault(self._host_key(), {})
+        host.setdefault('voices', {})[voice_name] = settings
+
+        with open(TTS_TUNING_FILE, 'w', encoding='utf-8') as f:
+            json.dump(tuning, f, indent=2)
+        self.tuning = host['voices']
+
+    def get_synthesis_settings(self, voice_name):
+        """Return the worker and ONNX thread counts to use for a voice."""
+        settings = self.tuning.get(voice_name, {})
+        return {
+            'workers': settings.get('workers', DEFAULT_SYNTHESIS_WORKERS),
+            'threads': settings.get('threads', DEFAULT_ONNX_THREADS)
+        }
         
     def _split_script_by_speakers(self, script):
         """Split the podcast script into segments by speaker."""
@@ -49,8 +113,58 @@ class TTSEngine:
             
         return segments
 
-    def _synthesize_segment(self, text, voice_name):
-        """Synthesize a single segment of text using Piper TTS."""
+    def _load_voice(self, voice_name, threads):
+        """Load a Piper voice in-process with a fixed ONNX Runtime thread count."""
+        # Only needed for calibrated settings; the default path uses the piper CLI.
+        # This is the piper-tts 1.2 API pinned in requirements.txt, where
+        # PiperVoice.synthesize writes straight into a wave file.
+        import onnxruntime
+        from piper import PiperVoice
+        from piper.config import PiperConfig
+
+        model_path = self.voices[voice_name]['model_path']
+        with open(f"{model_path}.json", 'r', encoding='utf-8') as f:
+            config = PiperConfig.from_dict(json.load(f))
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        # Operators run sequentially, so extra inter-op threads would sit idle
+        options.inter_op_num_threads = 1
+        session = onnxruntime.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=['CPUExecutionProvider']
+        )
+        return PiperVoice(session=session, config=config)
+
+    @contextmanager
+    def _checkout_voice(self, voice_name, threads):
+        """
+        Borrow an in-process voice for one worker.
+
+        Each concurrent worker gets its own session so that workers never
+        share a thread pool, and sessions are kept for reuse afterwards.
+        """
+        key = (voice_name, threads)
+        with self._voice_lock:
+            idle = self._idle_voices.setdefault(key, [])
+            voice = idle.pop() if idle else None
+        if voice is None:
+            voice = self._load_voice(voice_name, threads)
+        try:
+            yield voice
+        finally:
+            with self._voice_lock:
+                self._idle_voices[key].append(voice)
+
+    def _synthesize_segment(self, text, voice_name, threads=None):
+        """
+        Synthesize a single segment of text using Piper TTS.
+
+        Without a thread count the piper CLI is used. With one, the voice is
+        loaded in-process so ONNX Runtime uses exactly that many threads.
+        """
+        output_path = None
         try:
             voice_config = self.voices[voice_name]
             model_path = voice_config['model_path']
@@ -67,6 +181,19 @@ class TTSEngine:
             # Debug: Print the output path
             print(f"Output audio file will be saved at: {output_path}")
             
+            if threads:
+                with self._checkout_voice(voice_name, threads) as voice:
+                    wav_file = wave.open(output_path, 'wb')
+                    try:
+                        voice.synthesize(text, wav_file)
+                    except Exception:
+                        # The WAV header is incomplete, so closing would raise and hide the real error
+                        with suppress(wave.Error):
+                            wav_file.close()
+                        raise
+                    wav_file.close()
+                return output_path
+            
             # Run Piper TTS command
             cmd = [
                 '/system/conda/miniconda3/envs/cloudspace/bin/piper',  # Ensure 'piper' is in your PATH
@@ -93,13 +220,26 @@ class TTSEngine:
             
         except subprocess.CalledProcessError as e:
             print(f"Error running Piper TTS: {e.stderr.decode('utf-8')}")
+            self._remove_partial_output(output_path)
             raise
         except Exception as e:
             print(f"Error synthesizing speech: {str(e)}")
+            self._remove_partial_output(output_path)
             raise
 
-    def _combine_audio_files(self, audio_files):
-        """Combine multiple audio files into a single file."""
+    @staticmethod
+    def _remove_partial_output(output_path):
+        """Delete a temporary audio file left behind by a failed synthesis."""
+        if output_path and os.path.exists(output_path):
+            os.unlink(output_path)
+
+    def _combine_audio_files(self, audio_files, segments=None):
+        """
+        Combine multiple audio files into a single file.
+
+        When the speaker segments are given, their time offsets are written to
+        a chapters file next to the combined audio.
+        """
         combined_path = os.path.join(
             self.output_dir,
             f"podcast_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{AUDIO_FORMAT}"
@@ -107,8 +247,10 @@ class TTSEngine:
         
         # Read and combine all audio data
         combined_audio = []
+        frame_counts = []
         for audio_file in audio_files:
             with wave.open(audio_file, 'rb') as wf:
+                frame_counts.append(wf.getnframes())
                 audio_data = wf.readframes(wf.getnframes())
                 combined_audio.append(audio_data)
         
@@ -120,28 +262,205 @@ class TTSEngine:
             for audio_data in combined_audio:
                 wf.writeframes(audio_data)
         
+        if segments is not None:
+            chapters_path = os.path.splitext(combined_path)[0] + CHAPTERS_FILE_SUFFIX
+            with open(chapters_path, 'w', encoding='utf-8') as f:
+                json.dump(self._build_chapters(segments, frame_counts), f, indent=2)
+        
         # Clean up temporary files
         for audio_file in audio_files:
             os.unlink(audio_file)
         
         return combined_path
 
-    def generate_podcast_audio(self, script, host_voice, expert_voice):
-        """Generate audio for the entire podcast script."""
+    def _build_chapters(self, segments, frame_counts):
+        """Build chapters with start and end offsets from each turn's frame count."""
+        chapters = []
+        total_frames = 0
+        for segment, frame_count in zip(segments, frame_counts):
+            chapters.append({
+                'title': self._chapter_title(segment),
+                'speaker': segment['speaker'].strip('*'),
+                'start': total_frames / SAMPLE_RATE,
+                'end': (total_frames + frame_count) / SAMPLE_RATE
+            })
+            total_frames += frame_count
+        return chapters
+
+    def _write_segmented_audio(self, audio_files, segments):
+        """Write audio files as fixed-duration segments plus a chapter index."""
+        if not audio_files:
+            raise ValueError("Script contains no speaker turns to synthesize")
+
+        # mkdtemp guarantees a fresh directory even for episodes generated in the same second
+        segment_dir = tempfile.mkdtemp(
+            dir=self.output_dir,
+            prefix=f"podcast_{datetime.now().strftime('%Y%m%d_%H%M%S')}_"
+        )
+        frames_per_segment = SEGMENT_DURATION * SAMPLE_RATE
+
+        media_segments = []
+        frame_counts = []
+        total_frames = 0
+        writer = None
+        writer_frames = 0
+
+        def open_next_segment():
+            filename = f"segment_{len(media_segments):05d}.{AUDIO_FORMAT}"
+            media_segments.append({
+                'file': filename,
+                'start': total_frames / SAMPLE_RATE,
+                'duration': 0.0
+            })
+            wf = wave.open(os.path.join(segment_dir, filename), 'wb')
+            wf.setnchannels(1)  # mono
+            wf.setsampwidth(2)  # 16-bit
+            wf.setframerate(SAMPLE_RATE)
+            return wf
+
+        try:
+            # Stream each speaker turn into the segments, rolling over whenever
+            # the current segment is full so no segment exceeds SEGMENT_DURATION
+            for audio_file in audio_files:
+                with wave.open(audio_file, 'rb') as rf:
+                    frame_counts.append(rf.getnframes())
+                    remaining = rf.getnframes()
+                    while remaining > 0:
+                        if writer is None or writer_frames >= frames_per_segment:
+                            if writer is not None:
+                                writer.close()
+                            writer = open_next_segment()
+                            writer_frames = 0
+                        count = min(remaining, frames_per_segment - writer_frames)
+                        writer.writeframes(rf.readframes(count))
+                        writer_frames += count
+                        total_frames += count
+                        remaining -= count
+                        media_segments[-1]['duration'] = writer_frames / SAMPLE_RATE
+        finally:
+            if writer is not None:
+                writer.close()
+
+        duration = total_frames / SAMPLE_RATE
+        chapters = self._build_chapters(segments, frame_counts)
+
+        # Write an extended M3U playlist so external players can stream the segments
+        with open(os.path.join(segment_dir, SEGMENT_PLAYLIST_FILE), 'w', encoding='utf-8') as f:
+            f.write("#EXTM3U\n")
+            for media_segment in media_segments:
+                f.write(f"#EXTINF:{media_segment['duration']:.3f},\n")
+                f.write(f"{media_segment['file']}\n")
+
+        index = {
+            'sample_rate': SAMPLE_RATE,
+            'segment_duration': SEGMENT_DURATION,
+            'duration': duration,
+            'playlist': SEGMENT_PLAYLIST_FILE,
+            'segments': media_segments,
+            'chapters': chapters
+        }
+        index_path = os.path.join(segment_dir, SEGMENT_INDEX_FILE)
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=2)
+
+        # Clean up temporary files
+        for audio_file in audio_files:
+            os.unlink(audio_file)
+
+        return index_path
+
+    @staticmethod
+    def _chapter_title(segment, max_words=8):
+        """Build a short chapter title from a speaker segment."""
+        words = segment['text'].split()
+        title = ' '.join(words[:max_words])
+        if len(words) > max_words:
+            title += '...'
+        return f"{segment['speaker'].strip('*').title()}: {title}"
+
+    def load_segment_index(self, index_path):
+        """Load a segmented podcast index written by generate_podcast_audio."""
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        index['directory'] = os.path.dirname(os.path.abspath(index_path))
+        return index
+
+    def load_chapters(self, audio_path):
+        """Load the chapters of a combined audio file or a segmented podcast index."""
+        if audio_path.endswith(SEGMENT_INDEX_FILE):
+            return self.load_segment_index(audio_path)['chapters']
+
+        chapters_path = os.path.splitext(audio_path)[0] + CHAPTERS_FILE_SUFFIX
+        if not os.path.exists(chapters_path):
+            return []
+        with open(chapters_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def get_segment_paths(self, index):
+        """Return the segment files listed in an episode's playlist, in play order."""
+        with open(os.path.join(index['directory'], index['playlist']), 'r', encoding='utf-8') as f:
+            return [
+                os.path.join(index['directory'], line.strip())
+                for line in f
+                if line.strip() and not line.startswith('#')
+            ]
+
+    def locate_offset(self, index, seconds):
+        """Return the segment path and the offset within it for a timeline position."""
+        segments = index['segments']
+        if not segments:
+            raise ValueError("Segment index contains no segments")
+
+        seconds = min(max(seconds, 0.0), index['duration'])
+        position = min(int(seconds // index['segment_duration']), len(segments) - 1)
+        segment = segments[position]
+        segment_path = os.path.join(index['directory'], segment['file'])
+        return segment_path, seconds - segment['start']
+
+    def generate_podcast_audio(self, script, host_voice, expert_voice, segmented=False):
+        """
+        Generate audio for the entire podcast script.
+
+        When segmented is True the episode is written as fixed-duration segments
+        with a playlist and a chapter index, and the path to the index is
+        returned instead of a single combined audio file.
+        """
         try:
             # Split script into segments
             segments = self._split_script_by_speakers(script)
             
-            # Synthesize each segment
-            audio_files = []
-            for segment in segments:
+            # Use the calibrated settings, keeping the smaller worker count of the two voices
+            host_settings = self.get_synthesis_settings(host_voice)
+            expert_settings = self.get_synthesis_settings(expert_voice)
+            workers = max(1, min(host_settings['workers'], expert_settings['workers']))
+
+            def synthesize(segment):
                 print(segment['speaker'])
-                voice = host_voice if segment['speaker'] == '**host' else expert_voice
-                audio_path = self._synthesize_segment(segment['text'], voice)
-                audio_files.append(audio_path)
+                if segment['speaker'] == '**host':
+                    return self._synthesize_segment(segment['text'], host_voice, host_settings['threads'])
+                return self._synthesize_segment(segment['text'], expert_voice, expert_settings['threads'])
+
+            # Synthesize each segment, stopping queued turns after the first failure
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(synthesize, segment) for segment in segments]
+                wait(futures, return_when=FIRST_EXCEPTION)
+                for future in futures:
+                    future.cancel()
+
+            # Keep the script order; on failure delete the turns that did finish
+            try:
+                audio_files = [future.result() for future in futures]
+            except BaseException:
+                for future in futures:
+                    if not future.cancelled() and future.exception() is None:
+                        os.unlink(future.result())
+                raise
             
+            if segmented:
+                return self._write_segmented_audio(audio_files, segments)
+
             # Combine all audio segments
-            final_audio_path = self._combine_audio_files(audio_files)
+            final_audio_path = self._combine_audio_files(audio_files, segments)
             
             return final_audio_path
             